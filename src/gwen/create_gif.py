@@ -20,7 +20,9 @@ from typing import Tuple
 
 # Third-party
 import click
+import dask
 import matplotlib.pyplot as plt
+import numpy as np
 import xarray as xr
 from matplotlib import animation
 from matplotlib.figure import Figure
@@ -70,7 +72,9 @@ def get_var_min_max(var: xr.DataArray) -> Tuple[float, float]:
         the variable.
 
     """
-    return float(var.min()), float(var.max())
+    # Compute both reductions together, so that dask reads the chunks only once
+    var_min, var_max = dask.compute(var.min(), var.max())
+    return float(var_min), float(var_max)
 
 
 def open_input_file(input_file: str) -> xr.Dataset:
@@ -133,7 +137,18 @@ def plot_first_time_step(var: xr.DataArray, ax: plt.Axes) -> AxesImage:
 
     """
     var_min, var_max = get_var_min_max(var)
-    im = var.isel(time=0).plot(vmin=var_min, vmax=var_max, ax=ax)
+    # A raw imshow can be updated with plain arrays, unlike xarray's plot wrapper
+    im = ax.imshow(
+        var.isel(time=0).transpose("height", "ncells").values,
+        vmin=var_min,
+        vmax=var_max,
+        origin="lower",
+        aspect="auto",
+        animated=True,
+    )
+    plt.colorbar(im, ax=ax, label=var.name)
+    ax.set_xlabel("ncells")
+    ax.set_ylabel("height")
     plt.gca().invert_yaxis()
     return im
 
@@ -177,10 +192,16 @@ def create_update_function(
         animation.FuncAnimation: The update function for the animation.
 
     """
+    # Materialize the frames once, so that each update is a plain numpy slice
+    frames = var.transpose("time", "height", "ncells").values
+    # Time since the first step in seconds, for all frames at once
+    times = np.rint((var.time.values - var.time.values[0]) * 24 * 3600).astype(
+        np.int64
+    )
 
     def update(frame: int) -> AxesImage:
-        time_in_seconds = round((var.time[frame] - var.time[0]).item() * 24 * 3600)
-        im.set_array(var.isel(time=frame))
+        time_in_seconds = int(times[frame])
+        im.set_array(frames[frame])
         plt.title(f"Var: {var_name}; Time: {time_in_seconds:.0f} s\n{member_name}")
         return im
 
@@ -216,7 +237,9 @@ def save_animation(ani: animation.FuncAnimation, output_filename: str) -> None:
 
     """
     try:
-        ani.save(output_filename, writer="imagemagick", dpi=100)
+        # Encode in-process at the frame rate of the 100 ms animation interval,
+        # instead of piping every frame to an external imagemagick process
+        ani.save(output_filename, writer=animation.PillowWriter(fps=10), dpi=72)
     except RuntimeError as error:
         logger.error("Error in saving output file: %s", error)
 
@@ -248,7 +271,8 @@ def main(input_file: str, var_name: str, out_dir: str) -> None:
                 member = random.randint(0, len(ds.member) - 1)
             else:
                 member = i
-            var = select_variable(ds, var_name, member=member)
+            # Load the member once, it is read for the colour range and the frames
+            var = select_variable(ds, var_name, member=member).load()
             member_str = get_member_name(ds.member[member].item())
         except KeyError as error:
             logger.error("Error in selecting the variable: %s", error)
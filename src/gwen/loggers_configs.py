@@ -1,5 +1,7 @@
 """Provide logging for the gwen package."""
 # Standard library
+import copy
+import functools
 import json
 import logging
 import re
@@ -59,13 +61,24 @@ def setup_logger() -> logging.Logger:
     return logger
 
 
-def load_config():
-    """Load the configuration for the gwen project."""
+@functools.lru_cache(maxsize=1)
+def read_config() -> dict:
+    """Read and parse the configuration file, only on the first call."""
     with open(str(here()) + "/src/gwen/config.json", "r", encoding="UTF-8") as f:
         config = json.load(f)
     return config
 
 
+def load_config():
+    """Load the configuration for the gwen project.
+
+    The file is parsed only once, each call returns its own copy of the parsed
+    configuration, which callers may modify.
+
+    """
+    return copy.deepcopy(read_config())
+
+
 def setup_mlflow() -> Tuple[str, str]:
     """Set up the MLflow experiment and artifact path based on the hostname.
 
@@ -101,7 +114,8 @@ def setup_mlflow() -> Tuple[str, str]:
 
 def suppress_warnings():
     """Suppresses certain warnings that are not relevant to the user."""
-    warnings.simplefilter("always")
+    # Show each warning once per location, "always" formats it on every call
+    warnings.simplefilter("default")
     warnings.filterwarnings("ignore", category=matplotlib.MatplotlibDeprecationWarning)
     warnings.filterwarnings("ignore", message="Setuptools is replacing dist")
     warnings.filterwarnings(
@@ -8,6 +8,7 @@ from _typeshed import Incomplete
 logger: Incomplete
 
 def setup_logger() -> logging.Logger: ...
+def read_config() -> dict: ...
 def load_config(): ...
 def setup_mlflow() -> Tuple[str, str]: ...
 def suppress_warnings() -> None: ...
@@ -5,20 +5,125 @@ This module contains the following classes:
     EnsembleVarRegLoss: Ensemble variance regularization loss function.
     MaskedLoss: Masked loss function.
 
+This module contains the following functions:
+    compile_loss: Compile a loss function, falling back to eager mode on failure.
+    crps_loss: Compiled computation of the CRPSLoss.
+    ensemble_var_reg_loss: Compiled computation of the EnsembleVarRegLoss.
+    masked_mean: Compiled computation of the MaskedLoss reduction.
+
 """
 # Standard library
+import functools
+import math
 from typing import Any
+from typing import Callable
+from typing import Optional
 
 # Third-party
 import torch
 from torch import nn
-from torch.distributions import Normal
+from torch._dynamo.exc import BackendCompilerFailed
+from torch._dynamo.exc import InternalTorchDynamoError
+from torch._dynamo.exc import Unsupported
 
 # First-party
 from gwen.loggers_configs import setup_logger
 
 logger = setup_logger()
 
+# Constants of the closed form CRPS of a normal distribution
+INV_SQRT_2PI = 1.0 / math.sqrt(2.0 * math.pi)
+INV_SQRT_PI = 1.0 / math.sqrt(math.pi)
+
+# Errors of torch.compile after which the eager function is used instead
+COMPILER_ERRORS = (BackendCompilerFailed, InternalTorchDynamoError, Unsupported)
+
+
+def compile_loss(function: Callable[..., torch.Tensor]) -> Callable[..., torch.Tensor]:
+    """Compile a loss function and fall back to eager mode if compilation fails.
+
+    The losses are small elementwise and reduction kernels, compiling them fuses these
+    into few kernels. The default mode is used, since the CUDA graphs of the
+    reduce-overhead mode would be re-captured for every new batch shape.
+
+    The function is compiled on its first call and not at import, since torch.compile
+    raises right away on Python versions it does not support. Only failures of the
+    compiler switch to eager mode, any other error is raised.
+
+    Args:
+        function: The loss function to compile.
+
+    Returns:
+        The compiled loss function.
+
+    """
+    compiled_function: Optional[Callable[..., torch.Tensor]] = None
+    use_eager = False
+
+    def fall_back(error: Exception) -> None:
+        nonlocal use_eager
+        logger.warning(
+            "Compiling %s failed, falling back to eager mode: %s",
+            function.__name__,
+            error,
+        )
+        use_eager = True
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        nonlocal compiled_function
+        if compiled_function is None and not use_eager:
+            try:
+                compiled_function = torch.compile(
+                    function, mode="default", dynamic=False
+                )
+            except RuntimeError as e:
+                fall_back(e)
+        if not use_eager:
+            try:
+                return compiled_function(*args, **kwargs)  # type: ignore [misc]
+            except COMPILER_ERRORS as e:
+                fall_back(e)
+        return function(*args, **kwargs)
+
+    return wrapper
+
+
+@compile_loss
+def crps_loss(outputs: torch.Tensor, target: torch.Tensor, dim: int) -> torch.Tensor:
+    """Calculate the CRPS of a normal distribution fitted to the ensemble.
+
+    Args:
+        outputs: Predicted values.
+        target: Target values.
+        dim: Dimension over which to calculate the mean and standard deviation.
+
+    Returns:
+        crps_loss: CRPS loss for each sample in the batch.
+
+    """
+    # Reduce in float32, also for half precision outputs and targets
+    outputs = outputs.float()
+    target = target.float()
+
+    # Variance and mean over ensemble members in a single pass
+    var, mu = torch.var_mean(outputs, dim=dim)
+    # Inverse stddev over ensemble members, the CRPS itself needs the stddev only once
+    inv_sigma = torch.rsqrt(var + 1e-12)
+    sigma = (var + 1e-12) * inv_sigma
+
+    # Standardized residual of the target and the normal pdf and cdf at it
+    z = (target - mu) * inv_sigma
+    pdf = torch.exp(-0.5 * z**2) * INV_SQRT_2PI
+    cdf = torch.special.ndtr(z)
+
+    # Closed form CRPS of a normal distribution
+    crps = sigma * (z * (2 * cdf - 1) + 2 * pdf - INV_SQRT_PI)
+
+    # Calculate the CRPS loss for each sample in the batch Mean over ensemble members
+    # and spatial locations
+    return torch.mean(crps, dim=[1, 2, 3])
+
 
 class CRPSLoss(nn.Module):
     """Continuous Ranked Probability Score (CRPS) loss function.
@@ -42,7 +147,8 @@ class CRPSLoss(nn.Module):
         """Calculate the CRPS loss for each sample in the batch.
 
         This method calculates the CRPS loss for each sample in the batch using the
-        predicted values and target values.
+        predicted values and target values. The ensemble is approximated by a normal
+        distribution, for which the CRPS has a closed form.
 
         Args:
             outputs: Predicted values.
@@ -53,26 +159,37 @@ class CRPSLoss(nn.Module):
             crps_loss: CRPS loss for each sample in the batch.
 
         """
-        # Calculate the mean and standard deviation of the predicted distribution
         try:
-            mu = torch.mean(outputs, dim=dim)  # Mean over ensemble members
-            # Stddev over ensemble members
-            sigma = torch.std(outputs, dim=dim) + 1e-6
-
-            # Create a normal distribution with the predicted mean and standard
-            # deviation
-            dist = Normal(mu, sigma)
-
-            # Calculate the CRPS loss for each sample in the batch Mean over ensemble
-            # members and spatial locations
-            crps_loss = torch.mean((dist.cdf(target) - 0.5) ** 2, dim=[1, 2, 3])
-
-            return crps_loss
+            return crps_loss(outputs, target, dim)
         except Exception as e:
             logger.exception("Error calculating CRPS loss: %s", e)
             raise
 
 
+@compile_loss
+def ensemble_var_reg_loss(
+    outputs: torch.Tensor, target: torch.Tensor, alpha: float
+) -> torch.Tensor:
+    """Calculate the L1 loss regularized by the ensemble variance.
+
+    The function is compiled, so that the L1 and the variance reductions over the
+    outputs are fused instead of reading the outputs once per reduction.
+
+    Args:
+        outputs: Predicted values.
+        target: Target values.
+        alpha: Regularization strength.
+
+    Returns:
+        l1_loss + regularization_loss: Loss for each sample in the batch.
+
+    """
+    l1_loss = torch.mean(torch.abs(outputs - target))
+    ensemble_variance = torch.var(outputs, dim=1)
+    regularization_loss = -alpha * torch.mean(ensemble_variance)
+    return l1_loss + regularization_loss
+
+
 class EnsembleVarRegLoss(nn.Module):
     """Ensemble variance regularization loss function.
 
@@ -112,10 +229,7 @@ class EnsembleVarRegLoss(nn.Module):
 
         """
         try:
-            l1_loss = torch.mean(torch.abs(outputs - target))
-            ensemble_variance = torch.var(outputs, dim=1)
-            regularization_loss = -self.alpha * torch.mean(ensemble_variance)
-            return l1_loss + regularization_loss
+            return ensemble_var_reg_loss(outputs, target, self.alpha)
         except Exception as e:
             logger.exception(
                 "Error calculating ensemble variance regularization loss: %s", e
@@ -123,6 +237,25 @@ class EnsembleVarRegLoss(nn.Module):
             raise
 
 
+@compile_loss
+def masked_mean(
+    loss: torch.Tensor, mask: torch.Tensor, inv_mask_count: torch.Tensor
+) -> torch.Tensor:
+    """Calculate the mean loss over all unmasked cells.
+
+    Args:
+        loss: Loss for each cell.
+        mask: Mask for cells where the values stay constant over all observed times.
+        inv_mask_count: Inverse of the number of unmasked cells.
+
+    Returns:
+        mean_loss: Mean loss over all unmasked cells.
+
+    """
+    # Mask the loss for cells where the values stay constant over all observed times
+    return torch.sum(loss * mask) * inv_mask_count
+
+
 class MaskedLoss(nn.Module):
     """Masked loss function.
 
@@ -131,23 +264,34 @@ class MaskedLoss(nn.Module):
 
     Args:
         loss_fn: Loss function to use.
+        mask: Mask to use if none is passed to forward.
 
     Returns:
         mean_loss: Mean loss over all unmasked cells.
 
     """
 
-    def __init__(self, loss_fn: nn.Module) -> None:
+    def __init__(self, loss_fn: nn.Module, mask: Optional[torch.Tensor] = None) -> None:
         """Initialize the masked loss function.
 
         Args:
             loss_fn: Loss function to use.
+            mask: Mask to use if none is passed to forward. It is stored as a boolean
+                tensor and the inverse of the number of unmasked cells is computed once
+                here instead of in every call.
 
         """
         super().__init__()
         self.loss_fn = loss_fn
-
-    def forward(self, outputs: Any, target: Any, mask: Any) -> Any:
+        self.register_buffer("mask", None if mask is None else mask.bool())
+        # The count is clamped to 1, so that a fully masked field gives a zero loss
+        # instead of NaN
+        self.register_buffer(
+            "inv_mask_count",
+            None if mask is None else 1.0 / torch.sum(mask.float()).clamp_min(1.0),
+        )
+
+    def forward(self, outputs: Any, target: Any, mask: Optional[Any] = None) -> Any:
         """Calculate the loss for each sample using the specified loss function.
 
         This method calculates the loss for each sample in the batch using the specified
@@ -157,6 +301,7 @@ class MaskedLoss(nn.Module):
             outputs: Predicted values.
             target: Target values.
             mask: Mask for cells where the values stay constant over all observed times.
+                Defaults to the mask passed at initialization.
 
         Returns:
             mean_loss: Mean loss over all unmasked cells.
@@ -167,12 +312,13 @@ class MaskedLoss(nn.Module):
             # function
             loss = self.loss_fn(outputs, target)
 
-            # Mask the loss for cells where the values stay constant over all observed
-            # times
-            masked_loss = loss * mask
+            if mask is None:
+                mask, inv_mask_count = self.mask, self.inv_mask_count
+            else:
+                inv_mask_count = 1.0 / torch.sum(mask.float()).clamp_min(1.0)
 
             # Calculate the mean loss over all unmasked cells
-            mean_loss = torch.sum(masked_loss) / torch.sum(mask)
+            mean_loss = masked_mean(loss, mask, inv_mask_count)
 
             return mean_loss
         except Exception as e:
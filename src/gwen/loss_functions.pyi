@@ -1,7 +1,12 @@
 # Standard library
 from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import Tuple
+from typing import Type
 
 # Third-party
+import torch
 from _typeshed import Incomplete
 from torch import nn
 
@@ -9,17 +14,39 @@ from torch import nn
 from gwen.loggers_configs import setup_logger as setup_logger
 
 logger: Incomplete
+INV_SQRT_2PI: float
+INV_SQRT_PI: float
+COMPILER_ERRORS: Tuple[Type[Exception], ...]
+
+def compile_loss(
+    function: Callable[..., torch.Tensor]
+) -> Callable[..., torch.Tensor]: ...
+def crps_loss(
+    outputs: torch.Tensor, target: torch.Tensor, dim: int
+) -> torch.Tensor: ...
 
 class CRPSLoss(nn.Module):
     def __init__(self) -> None: ...
     def forward(self, outputs: Any, target: Any, dim: int = ...) -> Any: ...
 
+def ensemble_var_reg_loss(
+    outputs: torch.Tensor, target: torch.Tensor, alpha: float
+) -> torch.Tensor: ...
+
 class EnsembleVarRegLoss(nn.Module):
     alpha: Incomplete
     def __init__(self, alpha: float = ...) -> None: ...
     def forward(self, outputs: Any, target: Any) -> Any: ...
 
+def masked_mean(
+    loss: torch.Tensor, mask: torch.Tensor, inv_mask_count: torch.Tensor
+) -> torch.Tensor: ...
+
 class MaskedLoss(nn.Module):
     loss_fn: Incomplete
-    def __init__(self, loss_fn: nn.Module) -> None: ...
-    def forward(self, outputs: Any, target: Any, mask: Any) -> Any: ...
+    mask: Optional[torch.Tensor]
+    inv_mask_count: Optional[torch.Tensor]
+    def __init__(
+        self, loss_fn: nn.Module, mask: Optional[torch.Tensor] = ...
+    ) -> None: ...
+    def forward(self, outputs: Any, target: Any, mask: Optional[Any] = ...) -> Any: ...
@@ -1,8 +1,8 @@
 """Contains the models used for weather prediction."""
 # Standard library
+import contextlib
 import os
 from dataclasses import dataclass
-from typing import List
 from typing import Optional
 from typing import Tuple
 from typing import Union
@@ -35,11 +35,13 @@ class TrainingConfigCNN(dict):  # pylint: disable=too-many-instance-attributes
         dataloader (DataLoader): The data loader for the training dataset.
         optimizer (nn.Module): The optimizer used for training.
         scheduler (nn.Module): The learning rate scheduler used for training.
-        loss_fn (nn.Module): The loss function used for training.
-        mask (Optional[torch.Tensor]): The mask to apply to the input data.
+        loss_fn (nn.Module): The loss function used for training, a MaskedLoss
+            stores its mask.
         epochs (int): The number of epochs to train for.
         device (str): The device to use for training (default is "cuda").
         seed (int): The random seed to use for reproducibility (default is 42).
+        accumulation_steps (int): The number of batches to accumulate gradients over
+            before each optimizer step (default is 1).
 
     """
 
@@ -51,10 +53,23 @@ class TrainingConfigCNN(dict):  # pylint: disable=too-many-instance-attributes
         nn.MSELoss,
     ]
     batch_size: int
-    mask: Optional[torch.Tensor] = None
     epochs: int = 10
     device: str = "cuda"
     seed: int = 42
+    accumulation_steps: int = 1
+
+    def __post_init__(self) -> None:
+        """Validate the configuration.
+
+        Raises:
+            ValueError: If accumulation_steps is not a positive integer.
+
+        """
+        if not isinstance(self.accumulation_steps, int) or self.accumulation_steps < 1:
+            raise ValueError(
+                "accumulation_steps must be a positive integer, got "
+                f"{self.accumulation_steps!r}"
+            )
 
 
 # pylint: disable=R0902,R0801
@@ -64,9 +79,8 @@ class EvaluationConfigCNN(dict):
 
     Attributes:
         dataloader (DataLoader): The data loader for the evaluation dataset.
-        loss_fn (nn.Module): The loss function to use for evaluation.
-        mask (Optional[torch.Tensor], optional): A mask for the evaluation data.
-            Defaults to None.
+        loss_fn (nn.Module): The loss function to use for evaluation, a MaskedLoss
+            stores its mask.
         device (str, optional): The device to use for evaluation. Defaults to "cuda".
         seed (int, optional): The random seed to use for evaluation. Defaults to 42.
 
@@ -78,7 +92,6 @@ class EvaluationConfigCNN(dict):
         nn.MSELoss,
     ]
     batch_size: int
-    mask: Optional[torch.Tensor] = None
     device: str = "cuda"
     seed: int = 42
 
@@ -269,36 +282,6 @@ class Decoder(BaseNet):
         # pylint: disable=useless-parent-delegation
         super().__init__(channels_in, channels_out, hidden_size)
 
-    def crop(
-        self, encoder_layer: torch.Tensor, decoder_layer: torch.Tensor
-    ) -> torch.Tensor:
-        """Crop the encoder layer to the size of the decoder layer.
-
-        Args:
-            encoder_layer (torch.Tensor): Encoder tensor.
-            decoder_layer (torch.Tensor): Decoder tensor.
-
-        Returns:
-            torch.Tensor: Cropped tensor.
-
-        """
-        try:
-            diff_y = encoder_layer.size()[2] - decoder_layer.size()[2]
-            diff_x = encoder_layer.size()[3] - decoder_layer.size()[3]
-            encoder_layer = encoder_layer[
-                :,
-                :,
-                diff_y // 2 : encoder_layer.size()[2] - diff_y // 2,
-                diff_x // 2 : encoder_layer.size()[3] - diff_x // 2,
-            ]
-            if diff_y % 2 == 1:
-                encoder_layer = encoder_layer[:, :, 1 : encoder_layer.size()[2], :]
-            if diff_x % 2 == 1:
-                encoder_layer = encoder_layer[:, :, :, 1 : encoder_layer.size()[3]]
-        except IndexError as e:
-            logger.error("Error occurred while cropping the encoder layer: %s", e)
-        return encoder_layer
-
     def forward(  # pylint: disable=too-many-locals, too-many-statements
         self, x: Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]
     ) -> torch.Tensor:
@@ -306,14 +289,15 @@ class Decoder(BaseNet):
 
         Args:
             x (Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]): Tuple of
-            four tensors representing the input data.
+            four tensors representing the input data. The spatial dimensions of the
+            encoder input must be a multiple of 16, so that the skip connections
+            align with the upsampled tensors.
 
         Returns:
             torch.Tensor: Output tensor after passing through the CNN model.
 
         """
         x1, x2, x3, x4 = x
-        cropped = 0
 
         try:
             y1 = self.conv_transposed_layers[0](x4)
@@ -324,9 +308,6 @@ class Decoder(BaseNet):
 
             y1 = self.activation(y1)
 
-            if y1.shape != x3.shape:
-                x3 = self.crop(x3, y1)
-                cropped += x3.shape[3] - y1.shape[3]
             y1 = torch.cat([x3, y1], dim=1)
 
             y1 = self.activation(y1)
@@ -339,9 +320,6 @@ class Decoder(BaseNet):
 
             y2 = self.activation(y2)
 
-            if y2.shape != x2.shape:
-                x2 = self.crop(x2, y2)
-                cropped += x2.shape[3] - y2.shape[3]
             y2 = torch.cat([x2, y2], dim=1)
 
             y2 = self.activation(y2)
@@ -354,9 +332,6 @@ class Decoder(BaseNet):
 
             y3 = self.activation(y3)
 
-            if y3.shape != x1.shape:
-                x1 = self.crop(x1, y3)
-                cropped += x1.shape[3] - y3.shape[3]
             y3 = torch.cat([x1, y3], dim=1)
 
             y3 = self.activation(y3)
@@ -369,8 +344,6 @@ class Decoder(BaseNet):
 
             out = self.conv_layers[4](y4)
 
-            out = nn.functional.pad(out, (cropped * 2, 0, 0, 0), mode="replicate")
-
             if dist.get_rank() == 0:
                 logged_messages = set()
                 # Log the messages after each epoch, but only if they haven't been
@@ -401,13 +374,6 @@ class Decoder(BaseNet):
         return out
 
 
-def collate_fn(batch):
-    inputs, targets = zip(*batch)
-    inputs = torch.stack([torch.from_numpy(x.values) for x in inputs])
-    targets = torch.stack([torch.from_numpy(y.values) for y in targets])
-    return inputs, targets
-
-
 class UNet(BaseNet):
     """A class representing the UNet network.
 
@@ -432,6 +398,26 @@ class UNet(BaseNet):
         except RuntimeError as e:
             logger.error("Error occurred while initializing UNet network: %s", str(e))
 
+    def pad_to_multiple(self, x: torch.Tensor, multiple: int = 16) -> torch.Tensor:
+        """Pad the spatial dimensions of the input to a multiple of the given number.
+
+        With four pooling layers in the encoder, padding to a multiple of 16 makes all
+        skip connections align with the upsampled decoder tensors without cropping.
+
+        Args:
+        - x (torch.Tensor): The input tensor.
+        - multiple (int): The number the height and width are padded to a multiple of.
+
+        Returns:
+        - x (torch.Tensor): The padded input tensor.
+
+        """
+        pad_h = -x.shape[2] % multiple
+        pad_w = -x.shape[3] % multiple
+        if pad_h or pad_w:
+            x = nn.functional.pad(x, (0, pad_w, 0, pad_h), mode="replicate")
+        return x
+
     def forward(self, x: torch.Tensor) -> torch.Tensor:
         """Forward pass through the UNet network.
 
@@ -443,13 +429,12 @@ class UNet(BaseNet):
 
         """
         try:
-            x1, x2, x3, x4 = self.encoder(x)
+            height, width = x.shape[2], x.shape[3]
+            x1, x2, x3, x4 = self.encoder(self.pad_to_multiple(x))
 
             out: torch.Tensor = self.decoder((x1, x2, x3, x4))
-            if x.shape[3] != out.shape[3]:
-                out = nn.functional.pad(
-                    out, (x.shape[3] - out.shape[3], 0, 0, 0), mode="replicate"
-                )  # pad the output tensor
+            # Crop the output back to the size of the input
+            out = out[:, :, :height, :width]
             if dist.get_rank() == 0:
                 logger.debug("Output UNet shape: %s", out.shape)
 
@@ -479,6 +464,9 @@ class UNet(BaseNet):
         os.environ["MASTER_PORT"] = "12355"  # choose an available port
         os.environ["TORCH_DISTRIBUTED_DEBUG"] = "INFO"
         torch.cuda.set_device(rank)
+        # The input shapes are fixed, let cuDNN pick the fastest conv algorithms
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision("high")
         dist.init_process_group("nccl", rank=rank, world_size=world_size)
         if dist.get_rank() == 0:
             print("Training UNet network with configurations:", flush=True)
@@ -502,41 +490,92 @@ class UNet(BaseNet):
             sampler=sampler,
             num_workers=16,
             pin_memory=True,
-            collate_fn=collate_fn,  # Add the custom collate function here
+            persistent_workers=True,  # Keep the workers alive between epochs
+            prefetch_factor=4,
+            drop_last=True,  # Keep the batch shape fixed for the compiled model
         )
 
         device = configs_train_cnn.device
-        model = self.to(device)
-        model = nn.parallel.DistributedDataParallel(model, find_unused_parameters=True)
-        if configs_train_cnn.mask is not None:
-            configs_train_cnn.mask = configs_train_cnn.mask.to(device)
+        device_type = torch.device(device).type
+        # channels_last (NHWC) is the native layout of the Tensor Core conv kernels
+        model = self.to(device, memory_format=torch.channels_last)
+        # One process per GPU, each DDP replica is pinned to the GPU of its rank
+        model = nn.parallel.DistributedDataParallel(
+            model,
+            device_ids=[rank] if device_type == "cuda" else None,
+            find_unused_parameters=True,
+        )
+        # The uncompiled DDP model is kept around for checkpointing with MLflow and
+        # as fallback if compiling fails
+        try:
+            compiled_model = torch.compile(model, mode="reduce-overhead")
+        except RuntimeError as e:
+            logger.warning("Compiling the UNet failed, training in eager mode: %s", e)
+            compiled_model = model
+        # Compilation and CUDA graph capture only happen on the first forward pass
+        compiled_model_checked = compiled_model is model
+        # Buffers of the loss, such as the mask of a MaskedLoss, follow the model
+        loss_fn = configs_train_cnn.loss_fn.to(device)
+        # Mixed precision is only used on the GPU, on the CPU both are no-ops
+        use_amp = device_type == "cuda"
+        scaler = torch.cuda.amp.GradScaler(enabled=use_amp)
+        accumulation_steps = configs_train_cnn.accumulation_steps
+        num_batches = len(dataloader)
+        # The last accumulation window of an epoch may be shorter
+        last_window = num_batches % accumulation_steps or accumulation_steps
         best_loss = torch.tensor(float("inf")).to(device)
         try:
             for epoch in range(configs_train_cnn.epochs):
                 sampler.set_epoch(epoch)
-                running_loss = 0.0
-                for input_data, target_data in dataloader:
-                    input_data = input_data.to(device)
-                    target_data = target_data.to(device)
-                    configs_train_cnn.optimizer.zero_grad()
-                    # pylint: disable=not-callable
-                    output = model(input_data)
-                    if configs_train_cnn.mask is not None:
-                        loss = configs_train_cnn.loss_fn(
-                            output,
-                            target_data,
-                            configs_train_cnn.mask,
-                        )
-                    else:
-                        loss = configs_train_cnn.loss_fn(output, target_data)
-                    loss.backward()
-                    configs_train_cnn.optimizer.step()
-                    if configs_train_cnn.scheduler is not None:
-                        configs_train_cnn.scheduler.step()  # update the learning rate
-                    running_loss += loss.item()
-                avg_loss = torch.tensor(running_loss / float(len(dataloader))).to(
-                    device
-                )
+                # Accumulate on the device to avoid a host sync after every batch
+                running_loss = torch.zeros((), device=device)
+                for i, (input_data, target_data) in enumerate(dataloader, start=1):
+                    input_data = input_data.to(device, non_blocking=True).contiguous(
+                        memory_format=torch.channels_last
+                    )
+                    target_data = target_data.to(device, non_blocking=True)
+                    # Only all-reduce the gradients at the end of an accumulation
+                    step_optimizer = i % accumulation_steps == 0 or i == num_batches
+                    window = (
+                        last_window
+                        if i > num_batches - last_window
+                        else accumulation_steps
+                    )
+                    sync_context = (
+                        contextlib.nullcontext() if step_optimizer else model.no_sync()
+                    )
+                    with sync_context:
+                        with torch.autocast(
+                            device_type=device_type,
+                            dtype=torch.float16,
+                            enabled=use_amp,
+                        ):
+                            try:
+                                # pylint: disable=not-callable
+                                output = compiled_model(input_data)
+                            except RuntimeError as e:
+                                if compiled_model_checked:
+                                    raise
+                                logger.warning(
+                                    "Running the compiled UNet failed, training in "
+                                    "eager mode: %s",
+                                    e,
+                                )
+                                # Errors unrelated to compiling are raised again here
+                                compiled_model = model
+                                output = compiled_model(input_data)
+                            compiled_model_checked = True
+                            loss = loss_fn(output, target_data)
+                        # Average the gradients over the batches of the window
+                        scaler.scale(loss / window).backward()
+                    if step_optimizer:
+                        scaler.step(configs_train_cnn.optimizer)
+                        scaler.update()
+                        configs_train_cnn.optimizer.zero_grad(set_to_none=True)
+                    running_loss += loss.detach()
+                if configs_train_cnn.scheduler is not None:
+                    configs_train_cnn.scheduler.step()  # update the learning rate
+                avg_loss = running_loss / float(num_batches)
                 gathered_losses = (
                     [torch.zeros_like(avg_loss) for _ in range(dist.get_world_size())]
                     if dist.get_rank() == 0
@@ -585,6 +624,9 @@ class UNet(BaseNet):
         os.environ["MASTER_PORT"] = "12355"  # choose an available port
         os.environ["TORCH_DISTRIBUTED_DEBUG"] = "INFO"
         torch.cuda.set_device(rank)
+        # The input shapes are fixed, let cuDNN pick the fastest conv algorithms
+        torch.backends.cudnn.benchmark = True
+        torch.set_float32_matmul_precision("high")
         dist.init_process_group("nccl", rank=rank, world_size=world_size)
         # dist.init_process_group(
         #     "nccl", rank=rank, world_size=world_size) #TODO: eval on >1 GPU
@@ -604,32 +646,43 @@ class UNet(BaseNet):
             sampler=sampler,
             num_workers=16,
             pin_memory=True,
-            collate_fn=collate_fn,
         )
         device = configs_eval_cnn.device
-        model = self.to(device)
-        model = nn.parallel.DistributedDataParallel(model, find_unused_parameters=True)
+        device_type = torch.device(device).type
+        model = self.to(device, memory_format=torch.channels_last)
+        model = nn.parallel.DistributedDataParallel(
+            model,
+            device_ids=[rank] if device_type == "cuda" else None,
+            find_unused_parameters=True,
+        )
+        loss_fn = configs_eval_cnn.loss_fn.to(device)
         ranks = []
         model.eval()
         with torch.no_grad():
             loss: float = 0.0
-            y_preds: List[torch.Tensor] = []
+            y_preds: Optional[torch.Tensor] = None
+            offset = 0
             for input_data, target_data in dataloader_test:
-                input_data = input_data.to(device)
-                target_data = target_data.to(device)
-                # pylint: disable=not-callable
-                output = model(input_data)
-                if configs_eval_cnn.mask is not None:
-                    configs_eval_cnn.mask = configs_eval_cnn.mask.to(device)
-                    loss += configs_eval_cnn.loss_fn(
-                        output,
-                        target_data,
-                        configs_eval_cnn.mask,
-                    )
-                else:
-                    loss += configs_eval_cnn.loss_fn(output, target_data)
+                input_data = input_data.to(device, non_blocking=True).contiguous(
+                    memory_format=torch.channels_last
+                )
+                target_data = target_data.to(device, non_blocking=True)
+                with torch.autocast(
+                    device_type=device_type,
+                    dtype=torch.float16,
+                    enabled=device_type == "cuda",
+                ):
+                    # pylint: disable=not-callable
+                    output = model(input_data)
+                    loss += loss_fn(output, target_data)
                 ranks.append(rank)
-                y_preds.append(output)
+                if y_preds is None:
+                    # Allocate the predictions of this rank once and fill them in
+                    y_preds = torch.empty(
+                        (len(sampler), *output.shape[1:]), device=device
+                    )
+                y_preds[offset : offset + len(output)] = output
+                offset += len(output)
 
             avg_loss = torch.tensor(loss.item() / float(len(dataloader_test))).to(
                 device
@@ -644,14 +697,13 @@ class UNet(BaseNet):
             ranks_list = [
                 torch.zeros_like(ranks_tensor) for _ in range(dist.get_world_size())
             ]
-            y_preds_tensor = torch.cat(y_preds)
             y_preds_list = [
-                torch.zeros_like(y_preds_tensor) for _ in range(dist.get_world_size())
+                torch.zeros_like(y_preds) for _ in range(dist.get_world_size())
             ]
 
             dist.barrier()
             dist.all_gather(ranks_list, ranks_tensor)
-            dist.all_gather(y_preds_list, y_preds_tensor)
+            dist.all_gather(y_preds_list, y_preds)
             dist.gather(avg_loss, gather_list=gathered_losses, dst=0)
 
             y_preds_ordered = [
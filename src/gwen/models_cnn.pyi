@@ -1,5 +1,4 @@
 # Standard library
-from typing import Optional
 from typing import Tuple
 from typing import Union
 
@@ -24,10 +23,10 @@ class TrainingConfigCNN(dict):
     scheduler: Union[CyclicLR, StepLR]
     loss_fn: Union[nn.Module, nn.MSELoss]
     batch_size: int
-    mask: Optional[torch.Tensor]
     epochs: int
     device: str
     seed: int
+    accumulation_steps: int
     def __init__(
         self,
         dataset,
@@ -35,20 +34,20 @@ class TrainingConfigCNN(dict):
         scheduler,
         loss_fn,
         batch_size,
-        mask,
         epochs,
         device,
         seed,
+        accumulation_steps,
     ) -> None: ...
+    def __post_init__(self) -> None: ...
 
 class EvaluationConfigCNN(dict):
     dataset: ConvDataset
     loss_fn: Union[nn.Module, nn.MSELoss]
     batch_size: int
-    mask: Optional[torch.Tensor]
     device: str
     seed: int
-    def __init__(self, dataset, loss_fn, batch_size, mask, device, seed) -> None: ...
+    def __init__(self, dataset, loss_fn, batch_size, device, seed) -> None: ...
 
 class BaseNet(nn.Module):
     activation: Incomplete
@@ -75,19 +74,15 @@ class Decoder(BaseNet):
     def __init__(
         self, channels_in: int, channels_out: int, hidden_size: int
     ) -> None: ...
-    def crop(
-        self, encoder_layer: torch.Tensor, decoder_layer: torch.Tensor
-    ) -> torch.Tensor: ...
     def forward(self, x): ...
 
-def collate_fn(batch): ...
-
 class UNet(BaseNet):
     encoder: Incomplete
     decoder: Incomplete
     def __init__(
         self, channels_in: int, channels_out: int, hidden_size: int
     ) -> None: ...
+    def pad_to_multiple(self, x: torch.Tensor, multiple: int = ...) -> torch.Tensor: ...
     def forward(self, x: torch.Tensor): ...
     def train_with_configs(
         self, rank, configs_train_cnn: TrainingConfigCNN, world_size
@@ -144,11 +144,11 @@ class DownConvLayers(torch.nn.Module):
 
         """
         try:
-            x = torch.relu(self.conv1(x, edge_index))
-            x = torch.relu(self.conv2(x, edge_index))
-            x = torch.relu(self.conv3(x, edge_index))
-            # x = torch.relu(self.conv4(x, edge_index))
-            # x = torch.relu(self.conv5(x, edge_index))
+            x = torch.relu_(self.conv1(x, edge_index))
+            x = torch.relu_(self.conv2(x, edge_index))
+            x = torch.relu_(self.conv3(x, edge_index))
+            # x = torch.relu_(self.conv4(x, edge_index))
+            # x = torch.relu_(self.conv5(x, edge_index))
         except Exception as e:
             logger.error(
                 "Error occurred while performing forward pass in DownConvLayers: %s", e
@@ -199,10 +199,10 @@ class UpConvLayers(torch.nn.Module):
         """
         # TODO: do i need skip connections or batch normalization?
         try:
-            # x = torch.relu(self.upconv1(x, edge_index))
-            # x = torch.relu(self.upconv2(x, edge_index))
-            x = torch.relu(self.upconv3(x, edge_index))
-            x = torch.relu(self.upconv4(x, edge_index))
+            # x = torch.relu_(self.upconv1(x, edge_index))
+            # x = torch.relu_(self.upconv2(x, edge_index))
+            x = torch.relu_(self.upconv3(x, edge_index))
+            x = torch.relu_(self.upconv4(x, edge_index))
             x = self.upconv5(x, edge_index)
         except Exception as e:
             logger.error(
@@ -287,7 +287,7 @@ class GNNModel(torch.nn.Module):
         """
         super().__init__()
         self.conv_layers = GCNConvLayers(gnn_configs)
-        self.activation = torch.nn.ReLU()
+        self.activation = torch.nn.ReLU(inplace=True)
 
     def forward(self, x: torch.Tensor, edge_index: torch.Tensor) -> torch.Tensor:
         """Perform a forward pass through the GNN model.
@@ -359,7 +359,7 @@ class GNNModel(torch.nn.Module):
                         edge_index = data_flow.edge_index.to(device)
                         target_mask = data_flow.target_mask.to(device)
 
-                        configs_train_gnn.optimizer.zero_grad()
+                        configs_train_gnn.optimizer.zero_grad(set_to_none=True)
 
                         # Use the input data from the subgraph
                         output = model(  # pylint: disable=not-callable
@@ -371,10 +371,10 @@ class GNNModel(torch.nn.Module):
 
                         loss.backward()
                         configs_train_gnn.optimizer.step()
-                        if configs_train_gnn.scheduler is not None:
-                            configs_train_gnn.scheduler.step()
                         running_loss += loss
 
+                if configs_train_gnn.scheduler is not None:
+                    configs_train_gnn.scheduler.step()
                 avg_loss = running_loss / len(configs_train_gnn.dataset)
             print(f"Epoch: {epoch}, Loss: {avg_loss}", flush=True)
             torch.distributed.barrier()  # Wait for all workers to finish
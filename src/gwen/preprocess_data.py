@@ -85,20 +85,23 @@ def normalize_data(
 
     """
     try:
+        # Materialize the training data once, without copying in-memory arrays
+        data_train_np = data_train_raw.to_numpy()
+
         if method == "mean":
             center: np.floating = np.floating(np.array(data_train_raw.mean().values))
             scale: np.floating = np.floating(np.array(data_train_raw.std().values))
 
         elif method == "median":
-            center = np.nanmedian(np.array(data_train_raw.values)).astype(np.floating)
-            centered_ds = np.array(data_train_raw.values) - center
+            center = np.nanmedian(data_train_np).astype(np.floating)
+            centered_ds = data_train_np - center
             scale = np.nanmedian(np.abs(centered_ds)).astype(np.floating)
 
         else:
             raise ValueError("Invalid method. Must be 'mean' or 'median'.")
 
-        data_train_scaled = (np.array(data_train_raw.values) - center) / scale
-        data_test_scaled = (np.array(data_test_raw.values) - center) / scale
+        data_train_scaled = (data_train_np - center) / scale
+        data_test_scaled = (data_test_raw.to_numpy() - center) / scale
 
         with open(str(here()) + "/data/scaling.txt", "w", encoding="utf-8") as f:
             f.write("center: " + str(center) + "\n" + "scale: " + str(scale))
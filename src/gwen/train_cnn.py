@@ -4,7 +4,6 @@
 from typing import Union
 
 # Third-party
-import numpy as np
 import torch
 import torch.multiprocessing as mp
 import xarray as xr
@@ -38,9 +37,10 @@ def main():  # pylint: disable=too-many-locals, too-many-statements, too-many-br
         config, data_train, data_test = load_config_and_data()
         logger.info("Shape of training data: %s", data_train.shape)
         logger.info("Shape of test data: %s", data_test.shape)
-        # Create the dataset_train and dataloader
-        dataset_train = ConvDataset(data_train, config["member_split"])
-        dataset_test = ConvDataset(data_test, config["member_split"])
+        # Create the dataset_train and dataloader, the same seed gives both datasets
+        # the same split of the members
+        dataset_train = ConvDataset(data_train, config["member_split"], config["seed"])
+        dataset_test = ConvDataset(data_test, config["member_split"], config["seed"])
 
         # loss_fn: Union[
         #     EnsembleVarRegLoss, MaskedLoss, nn.MSELoss, nn.Module
@@ -53,11 +53,9 @@ def main():  # pylint: disable=too-many-locals, too-many-statements, too-many-br
             variance = data_train.var(dim="time")
             # Create a mask that hides all data with zero variance
             mask = variance <= config["mask_threshold"]
-            torch.from_numpy(mask.values.astype(float))
             logger.info("Number of masked cells: %d", sum((mask[0].values == 1)))
-
-        else:
-            mask = None
+            # Store the mask in the loss, which counts the unmasked cells only once
+            loss_fn = MaskedLoss(loss_fn.loss_fn, torch.from_numpy(mask.values))
 
         device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         logger.info("Using device: %s", device)
@@ -93,7 +91,6 @@ def main():  # pylint: disable=too-many-locals, too-many-statements, too-many-br
                 scheduler=scheduler,
                 loss_fn=loss_fn,
                 batch_size=config["batch_size"],
-                mask=mask,
                 epochs=config["epochs"],
                 device=device,
                 seed=config["seed"],
@@ -125,7 +122,6 @@ def main():  # pylint: disable=too-many-locals, too-many-statements, too-many-br
             dataset=dataset_test,
             loss_fn=loss_fn,
             batch_size=config["batch_size"],
-            mask=mask,
             device=device,
             seed=config["seed"],
         )
@@ -160,9 +156,7 @@ def main():  # pylint: disable=too-many-locals, too-many-statements, too-many-br
         else:
             slice0, slice1 = (config["member_split"], data_test.sizes["member"])
         y_pred_reshaped = xr.DataArray(
-            y_pred.numpy().reshape(
-                np.array(data_test.isel(member=slice(slice0, slice1)).values).shape
-            ),
+            y_pred.numpy().reshape(data_test.isel(member=slice(slice0, slice1)).shape),
             dims=["time", "member", "height", "ncells"],
         )
 
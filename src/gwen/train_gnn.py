@@ -43,7 +43,6 @@ Arguments:
 
 # Third-party
 import mlflow  # type: ignore
-import numpy as np
 import torch
 import torch.multiprocessing as mp
 
@@ -190,7 +189,7 @@ def main():  # pylint: disable=too-many-locals, too-many-statements
         # Plot the predictions
         # TODO: This might have changed check data_test_out dims
         y_pred_reshaped = xr.DataArray(
-            y_pred.numpy().reshape(np.array(data_test.values).shape),
+            y_pred.numpy().reshape(data_test.shape),
             dims=["time", "member", "height", "ncells"],
         )
 
@@ -7,20 +7,25 @@ Functions:
     animate: Animate the prediction evolution.
     create_animation: Create an animation of the prediction evolution.
     downscale_data: Downscale the data by the given factor.
+    downscale_data_cached: Downscale the data and cache the result on disk.
     get_runs: Get all runs from the specified experiment.
     load_best_model: Load the best checkpoint of the model recent MLflow run.
     load_config_and_data: Load the configuration and data.
     load_data: Load the data.
+    resolve_model_dir: Resolve the directory of the model artifacts of a run.
 
 """
 # Standard library
+import functools
+import hashlib
 import os
-from typing import Any
+import tempfile
 from typing import List
+from typing import Optional
 from typing import Tuple
+from urllib.parse import urlparse
 
 # Third-party
-import dask
 import matplotlib.pyplot as plt
 import mlflow  # type: ignore
 import numpy as np
@@ -29,8 +34,6 @@ import xarray as xr
 from matplotlib import animation
 from matplotlib import cm
 from matplotlib.image import AxesImage
-from numpy import dtype
-from numpy import signedinteger
 from pyprojroot import here
 from torch import nn
 from torch.utils.data import Dataset
@@ -56,57 +59,109 @@ class ConvDataset(Dataset):
     Args:
         data: The data to use.
         split: The split between train and test sets.
+        seed: Seed of the generator used to shuffle the members.
+        dtype: Data type of the samples.
 
     Returns:
         x, y: Data for the train and test sets.
 
     """
 
-    def __init__(self, data: xr.Dataset, split: int):
+    def __init__(
+        self,
+        data: xr.Dataset,
+        split: int,
+        seed: Optional[int] = None,
+        dtype: torch.dtype = torch.float32,
+    ):
         """Initialize the custom dataset class.
 
         Args:
             data: The data to use.
             split: The split between input and target sets.
+            seed: Seed of the generator used to shuffle the members before splitting
+                them. Datasets with the same seed and number of members use the same
+                split. Defaults to a random seed.
+            dtype: Data type the data is stored in, e.g. torch.bfloat16 to halve the
+                memory and the host to device transfers of mixed precision training.
+                Defaults to torch.float32.
 
         """
         super().__init__()
         try:
-            self.data: xr.Dataset = data
             self.split = split
-
-            # Get the number of members in the dataset
-            num_members: int = self.data.sizes["member"]
-
-            # Get the indices of the members
-            member_indices: np.ndarray[Any, dtype[signedinteger[Any]]] = np.arange(
-                num_members
+            self.num_times: int = data.sizes["time"]
+            self.num_members: int = data.sizes["member"]
+
+            # Materialize the data once as a contiguous tensor, so that __getitem__
+            # only slices it and does not go through xarray or dask for every sample.
+            # No reference to the xarray data is kept, so it is neither held twice in
+            # memory nor pickled into the processes of the DataLoader and DDP.
+            self.data_tensor: torch.Tensor = (
+                torch.from_numpy(
+                    np.ascontiguousarray(
+                        data.transpose("time", "member", "height", "ncells").values
+                    )
+                )
+                .to(dtype)
+                .contiguous()
             )
+            # DataLoader workers map the same buffer instead of each holding a copy
+            self.data_tensor.share_memory_()
 
-            # Shuffle the member indices
-            np.random.shuffle(member_indices)
+            # Each dataset has its own generator instead of using the global RNG
+            self.generator = torch.Generator()
+            if seed is None:
+                self.generator.seed()
+            else:
+                self.generator.manual_seed(seed)
 
-            # Split the member indices into input and target sets
-            self.input_indices: np.ndarray = member_indices[: self.split]
-            self.target_indices: np.ndarray = member_indices[self.split :]
-            if config["simplify"]:
-                simple_input_index = np.random.choice(self.input_indices)
-                self.input_indices = np.array(
-                    [simple_input_index, simple_input_index + 1]
-                )
-                simple_target_index = simple_input_index + 1
-                self.target_indices = np.array(
-                    [simple_target_index, simple_target_index + 1]
-                )
+            self.resample_split()
 
         except Exception as e:
             logger.exception("Error initializing custom dataset: %s", e)
             raise
 
+    def resample_split(self) -> None:
+        """Shuffle the members and split them into input and target sets.
+
+        Called once on initialization. Calling it again draws a new split from the
+        generator of the dataset, e.g. between epochs.
+
+        """
+        # Shuffle the member indices
+        member_indices: np.ndarray = torch.randperm(
+            self.num_members, generator=self.generator
+        ).numpy()
+
+        # Split the member indices into input and target sets
+        self.input_indices: np.ndarray = member_indices[: self.split]
+        self.target_indices: np.ndarray = member_indices[self.split :]
+        if config["simplify"]:
+            # The input indices are already shuffled
+            simple_input_index = self.input_indices[0]
+            self.input_indices = np.array([simple_input_index, simple_input_index + 1])
+            simple_target_index = simple_input_index + 1
+            self.target_indices = np.array(
+                [simple_target_index, simple_target_index + 1]
+            )
+
+        # Members of a sample, inputs followed by targets, so that __getitem__ only
+        # needs a single indexing operation
+        if config["simplify"]:
+            input_members = np.arange(*self.input_indices)
+            target_members = np.arange(*self.target_indices)
+        else:
+            input_members, target_members = self.input_indices, self.target_indices
+        self.sample_indices: torch.Tensor = torch.from_numpy(
+            np.concatenate([input_members, target_members])
+        ).long()
+        self.num_inputs: int = len(input_members)
+
     def __len__(self) -> int:
         """Get the length of the dataset."""
         try:
-            return len(self.data.time)
+            return self.num_times
         except Exception as e:
             logger.exception("Error getting length of dataset: %s", e)
             raise
@@ -120,22 +175,15 @@ class ConvDataset(Dataset):
             idx: Index of the data.
 
         Returns:
-            x, y: Data for the input and target sets.
+            x, y: Data for the input and target sets, as contiguous tensors that the
+            default collate function of the DataLoader can stack and pin.
 
         """
         try:
             # Get the data for the input and target sets
-            if config["simplify"]:
-                x = self.data.isel(
-                    member=slice(self.input_indices[0], self.input_indices[1]), time=idx
-                )
-                y = self.data.isel(
-                    member=slice(self.target_indices[0], self.target_indices[1]),
-                    time=idx,
-                )
-            else:
-                x = self.data.isel(member=self.input_indices, time=idx)
-                y = self.data.isel(member=self.target_indices, time=idx)
+            sample = torch.index_select(self.data_tensor[idx], 0, self.sample_indices)
+            x = sample[: self.num_inputs]
+            y = sample[self.num_inputs :]
 
         except Exception as e:
             logger.exception("Error getting data for input and target sets: %s", e)
@@ -146,7 +194,7 @@ class ConvDataset(Dataset):
     def __iter__(self):
         """Get an iterator for the dataset."""
         try:
-            return iter(self.data.time)
+            return iter(range(self.num_times))
         except Exception as e:
             logger.exception("Error getting iterator for dataset: %s", e)
             raise
@@ -227,13 +275,29 @@ def animate(data: xr.Dataset, member: str, preds: str) -> animation.FuncAnimatio
         # Create a new figure object
         fig, ax = plt.subplots()
 
+        # Materialize the data and the times once, the frames are then plain numpy
+        # slices and do not go through xarray's indexing
+        data_np = data.to_numpy()
+        times_np = np.rint(
+            (data.time.values - data.time.values[0]) * 24 * 3600
+        ).astype(np.int64)
+
         # Calculate the 5% and 95% percentile of the y_mem data
-        vmin, vmax = np.percentile(np.array(data.values), [1, 99])
+        vmin, vmax = np.percentile(data_np, [1, 99])
         # Create a colormap with grey for values outside of the range
-        cmap = cm.get_cmap("RdBu_r")
+        cmap = cm.get_cmap("RdBu_r").copy()
         cmap.set_bad(color="grey")
 
-        im: AxesImage = data.isel(time=0).plot(ax=ax, cmap=cmap, vmin=vmin, vmax=vmax)
+        im: AxesImage = ax.imshow(
+            data_np[0],
+            cmap=cmap,
+            vmin=vmin,
+            vmax=vmax,
+            origin="lower",
+            aspect="auto",
+            animated=True,
+        )
+        fig.colorbar(im, ax=ax)
 
         plt.gca().invert_yaxis()
 
@@ -260,10 +324,8 @@ def animate(data: xr.Dataset, member: str, preds: str) -> animation.FuncAnimatio
 
             """
             try:
-                time_in_seconds = round(
-                    (data.time[frame] - data.time[0]).item() * 24 * 3600
-                )
-                im.set_array(data.isel(time=frame))
+                time_in_seconds = int(times_np[frame])
+                im.set_data(data_np[frame])
                 title = (
                     f"Var: Theta_v - Time: {time_in_seconds:.0f} s\n"
                     f"Member: {member} - {preds}"
@@ -275,7 +337,12 @@ def animate(data: xr.Dataset, member: str, preds: str) -> animation.FuncAnimatio
                 raise e
 
         ani = animation.FuncAnimation(
-            fig, update, frames=range(len(data.time)), interval=50, blit=True
+            fig,
+            update,
+            frames=range(len(data.time)),
+            interval=50,
+            blit=True,
+            cache_frame_data=False,
         )
         return ani
     except Exception as e:
@@ -337,7 +404,8 @@ def create_animation(
     try:
         # Save the animation as a gif
         logger.info("Saving animation to %s", output_filename)
-        ani.save(output_filename, writer="imagemagick", dpi=100)
+        # Encode in-process at the frame rate of the 50 ms animation interval
+        ani.save(output_filename, writer=animation.PillowWriter(fps=20), dpi=72)
 
     except Exception as e:
         logger.exception(
@@ -369,14 +437,55 @@ def downscale_data(data: xr.Dataset, factor: int) -> xr.Dataset:
     if not isinstance(factor, int) or factor <= 0:
         raise ValueError(f"Factor must be a positive integer, but got {factor}")
 
-    with dask.config.set(
-        dict[str, bool](**{"array.slicing.split_large_chunks": False})
-    ):
-        # Coarsen the height and ncells dimensions by the given factor
-        data_coarse = (
-            data.coarsen(height=factor, ncells=factor).reduce(np.mean).compute()
-        )
-        return data_coarse
+    # Coarsen the height and ncells dimensions by the given factor
+    data_coarse = data.coarsen(height=factor, ncells=factor).mean().compute()
+    return data_coarse
+
+
+def downscale_data_cached(data: xr.Dataset, factor: int, data_path: str) -> xr.Dataset:
+    """Downscale the data by the given factor and cache the result on disk.
+
+    The downscaled values are saved to a .npy file under cache/ in the project root,
+    keyed by the path and modification time of the data and the factor. Later calls
+    memory-map that file instead of computing the coarsening again.
+
+    Args:
+        data: The data to downscale.
+        factor: The factor by which to downscale the data.
+        data_path: The path the data was loaded from, used as key of the cache.
+
+    Returns:
+        The downscaled data.
+
+    Raises:
+        ValueError: If the factor is not a positive integer.
+
+    """
+    # The modification time invalidates the cache when the data is regenerated
+    data_mtime = os.stat(data_path).st_mtime_ns
+    cache_key = hashlib.md5(f"{data_path}-{data_mtime}-{factor}".encode()).hexdigest()
+    cache_dir = os.path.join(str(here()), "cache")
+    cache_file = os.path.join(cache_dir, f"{cache_key}.npy")
+
+    if os.path.exists(cache_file):
+        logger.info("Loading downscaled data from %s", cache_file)
+        # Building the lazy coarsened array only computes its coordinates
+        data_coarse = data.coarsen(height=factor, ncells=factor).mean()
+        return data_coarse.copy(data=np.load(cache_file, mmap_mode="c"))
+
+    data_coarse = downscale_data(data, factor)
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temporary file first, so that an interrupted run does not leave a
+    # truncated cache file behind
+    with tempfile.NamedTemporaryFile(dir=cache_dir, suffix=".npy", delete=False) as f:
+        try:
+            np.save(f, data_coarse.values)
+        except BaseException:
+            f.close()
+            os.remove(f.name)
+            raise
+    os.replace(f.name, cache_file)
+    return data_coarse
 
 
 def get_runs(experiment_name: str) -> List[mlflow.entities.Run]:
@@ -409,6 +518,36 @@ def get_runs(experiment_name: str) -> List[mlflow.entities.Run]:
     return filtered_runs
 
 
+@functools.lru_cache(maxsize=32)
+def resolve_model_dir(experiment_name: str, run_id: str) -> str:
+    """Resolve the directory of the model artifacts of an MLflow run.
+
+    The result is cached, so repeated calls for the same run do not query the
+    MLflow tracking server or the file system again.
+
+    Args:
+        experiment_name (str): The name of the MLflow experiment.
+        run_id (str): The ID of the MLflow run.
+
+    Returns:
+        str: The path to the model artifacts of the run.
+
+    Raises:
+        FileNotFoundError: If the experiment or the model path does not exist.
+
+    """
+    # The artifacts of the runs are stored below the artifact location of their
+    # experiment
+    experiment = mlflow.get_experiment_by_name(experiment_name)
+    if experiment is None:
+        raise FileNotFoundError(f"Experiment does not exist: {experiment_name}")
+    experiment_path = urlparse(experiment.artifact_location).path
+    model_path = os.path.join(experiment_path, run_id, "artifacts", "models")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Best model path does not exist: {model_path}")
+    return model_path
+
+
 def load_best_model(experiment_name: str) -> nn.Module:
     """Load the best model from a given MLflow experiment.
 
@@ -427,14 +566,8 @@ def load_best_model(experiment_name: str) -> nn.Module:
         runs = get_runs(experiment_name)
         # [ ]: actually get the best model
 
-        run_id: str = runs.iloc[0].run_id  # type: ignore [attr-defined]
-        best_model_path = mlflow.get_artifact_uri()
-        best_model_path = os.path.abspath(os.path.join(best_model_path, "../../"))
-        best_model_path = os.path.join(best_model_path, run_id, "artifacts", "models")
-        if not os.path.exists(best_model_path):
-            raise FileNotFoundError(
-                f"Best model path does not exist: {best_model_path}"
-            )
+        run_id: str = runs.iloc[0]["run_id"]
+        best_model_path = resolve_model_dir(experiment_name, run_id)
         model = mlflow.pytorch.load_model(best_model_path)
     except (ValueError, FileNotFoundError) as e:
         logger.exception(str(e))
@@ -466,8 +599,17 @@ def load_config_and_data() -> Tuple[dict, xr.Dataset, xr.Dataset]:
                     f"Coarsen factor must be a positive integer, "
                     f"but got {configs['coarsen']}"
                 )
-            data_test = downscale_data(data_test, configs["coarsen"])
-            data_train = downscale_data(data_train, configs["coarsen"])
+            data_test = downscale_data_cached(
+                data_test, configs["coarsen"], str(here()) + configs["data_test"]
+            )
+            data_train = downscale_data_cached(
+                data_train, configs["coarsen"], str(here()) + configs["data_train"]
+            )
+
+        # Load the data into memory once, instead of decoding the zarr chunks again
+        # every time a sample, the mask or the plots access the lazy arrays
+        data_train = data_train.load()
+        data_test = data_test.load()
 
     except (FileNotFoundError, ValueError) as e:
         logger.exception(str(e))
@@ -490,10 +632,13 @@ def load_data(configs: dict) -> Tuple[xr.Dataset, xr.Dataset]:
 
     """
     try:
-        # Load the training data
-        data_train = (
-            xr.open_zarr(str(here()) + configs["data_train"]).to_array().squeeze()
-        )
+        # One chunk per time step, which is the sample dimension of the datasets
+        chunks = {"time": 1, "member": -1, "height": -1, "ncells": -1}
+
+        # Load the training data, the stores contain a single variable which is
+        # selected directly instead of stacking all variables with to_array
+        ds_train = xr.open_zarr(str(here()) + configs["data_train"], chunks=chunks)
+        data_train = ds_train[list(ds_train.data_vars)[0]]
         data_train = data_train.transpose(
             "time",
             "member",
@@ -502,11 +647,8 @@ def load_data(configs: dict) -> Tuple[xr.Dataset, xr.Dataset]:
         )
 
         # Load the test data
-        data_test = (
-            xr.open_zarr(str(here()) + configs["data_test"])
-            .to_array()
-            .squeeze(drop=False)
-        )
+        ds_test = xr.open_zarr(str(here()) + configs["data_test"], chunks=chunks)
+        data_test = ds_test[list(ds_test.data_vars)[0]]
         data_test = data_test.transpose(
             "time",
             "member",
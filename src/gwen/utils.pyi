@@ -1,5 +1,6 @@
 # Standard library
 from typing import List
+from typing import Optional
 from typing import Tuple
 
 # Third-party
@@ -23,11 +24,23 @@ logger: Incomplete
 config: Incomplete
 
 class ConvDataset(Dataset):
-    data: Incomplete
     split: Incomplete
+    num_times: int
+    num_members: int
+    data_tensor: Incomplete
     input_indices: Incomplete
     target_indices: Incomplete
-    def __init__(self, data: xr.Dataset, split: int) -> None: ...
+    sample_indices: Incomplete
+    num_inputs: Incomplete
+    generator: Incomplete
+    def __init__(
+        self,
+        data: xr.Dataset,
+        split: int,
+        seed: Optional[int] = ...,
+        dtype: torch.dtype = ...,
+    ) -> None: ...
+    def resample_split(self) -> None: ...
     def __len__(self) -> int: ...
     def __getitem__(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor]: ...
     def __iter__(self): ...
@@ -58,7 +71,11 @@ def create_animation(
     data: dict, member_pred: int, member_target: int, preds: str
 ) -> str: ...
 def downscale_data(data: xr.Dataset, factor: int) -> xr.Dataset: ...
+def downscale_data_cached(
+    data: xr.Dataset, factor: int, data_path: str
+) -> xr.Dataset: ...
 def get_runs(experiment_name: str) -> List[mlflow.entities.Run]: ...
+def resolve_model_dir(experiment_name: str, run_id: str) -> str: ...
 def load_best_model(experiment_name: str) -> nn.Module: ...
 def load_config_and_data() -> Tuple[dict, xr.Dataset, xr.Dataset]: ...
 def load_data(configs: dict) -> Tuple[xr.Dataset, xr.Dataset]: ...
@@ -0,0 +1,79 @@
+"""Tests for the loss_functions module."""
+# Standard library
+import math
+import unittest
+from unittest import mock
+
+# Third-party
+import torch
+
+# First-party
+from gwen.loss_functions import compile_loss
+from gwen.loss_functions import crps_loss
+from gwen.loss_functions import CRPSLoss
+from gwen.loss_functions import ensemble_var_reg_loss
+from gwen.loss_functions import EnsembleVarRegLoss
+
+
+def gaussian_crps(mu: float, sigma: float, target: float) -> float:
+    """CRPS of a normal distribution, computed with the math module."""
+    z = (target - mu) / sigma
+    cdf = 0.5 * (1 + math.erf(z / math.sqrt(2)))
+    pdf = math.exp(-0.5 * z**2) / math.sqrt(2 * math.pi)
+    return sigma * (z * (2 * cdf - 1) + 2 * pdf - 1 / math.sqrt(math.pi))
+
+
+class TestCRPSLoss(unittest.TestCase):
+    def setUp(self):
+        # (mu, sigma, target) of each sample, the last one has identical members and
+        # only the floor of the variance
+        cases = [(0.0, 1.0, 0.0), (1.0, 2.0, 2.5), (-1.0, 0.5, -3.0), (1.0, 0.0, 3.0)]
+        # Two members at mu -/+ sigma / sqrt(2) have the unbiased stddev sigma
+        self.outputs = torch.tensor(
+            [
+                [mu - sigma / math.sqrt(2) for mu, sigma, _ in cases],
+                [mu + sigma / math.sqrt(2) for mu, sigma, _ in cases],
+            ]
+        ).reshape(2, len(cases), 1, 1, 1)
+        self.target = torch.tensor([target for _, _, target in cases]).reshape(
+            len(cases), 1, 1, 1
+        )
+        # The variance is floored at 1e-12, i.e. the stddev at 1e-6
+        self.expected = torch.tensor(
+            [gaussian_crps(mu, max(sigma, 1e-6), target) for mu, sigma, target in cases]
+        )
+
+    def test_compiled(self):
+        loss = CRPSLoss()(self.outputs, self.target)
+        torch.testing.assert_close(loss, self.expected, rtol=1e-5, atol=1e-6)
+
+    def test_eager(self):
+        loss = crps_loss.__wrapped__(self.outputs, self.target, 0)
+        torch.testing.assert_close(loss, self.expected, rtol=1e-5, atol=1e-6)
+
+
+class TestEnsembleVarRegLoss(unittest.TestCase):
+    def setUp(self):
+        # Two members of one cell: L1 loss 1, unbiased ensemble variance 2
+        self.outputs = torch.tensor([[1.0, 3.0]])
+        self.target = torch.tensor([[2.0, 2.0]])
+        self.alpha = 0.1
+        self.expected = torch.tensor(1.0 - 0.1 * 2.0)
+
+    def test_compiled(self):
+        loss = EnsembleVarRegLoss(self.alpha)(self.outputs, self.target)
+        torch.testing.assert_close(loss, self.expected)
+
+    def test_eager_fallback(self):
+        # torch.compile raises on Python versions it does not support
+        with mock.patch.object(
+            torch, "compile", side_effect=RuntimeError("not supported")
+        ):
+            loss_fn = compile_loss(ensemble_var_reg_loss.__wrapped__)
+            loss = loss_fn(self.outputs, self.target, self.alpha)
+        torch.testing.assert_close(loss, self.expected)
+
+    def test_other_errors_are_raised(self):
+        loss_fn = compile_loss(ensemble_var_reg_loss.__wrapped__)
+        with self.assertRaises(RuntimeError):
+            loss_fn(self.outputs, torch.zeros(3, 3), self.alpha)
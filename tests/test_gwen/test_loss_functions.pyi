@@ -0,0 +1,25 @@
+# Standard library
+import unittest
+
+# Third-party
+from _typeshed import Incomplete
+
+def gaussian_crps(mu: float, sigma: float, target: float) -> float: ...
+
+class TestCRPSLoss(unittest.TestCase):
+    outputs: Incomplete
+    target: Incomplete
+    expected: Incomplete
+    def setUp(self) -> None: ...
+    def test_compiled(self) -> None: ...
+    def test_eager(self) -> None: ...
+
+class TestEnsembleVarRegLoss(unittest.TestCase):
+    outputs: Incomplete
+    target: Incomplete
+    alpha: float
+    expected: Incomplete
+    def setUp(self) -> None: ...
+    def test_compiled(self) -> None: ...
+    def test_eager_fallback(self) -> None: ...
+    def test_other_errors_are_raised(self) -> None: ...
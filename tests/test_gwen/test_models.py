@@ -77,6 +77,14 @@ class TestUNet(unittest.TestCase):
             output = model(self.x)
             self.assertEqual(output.shape, self.output_shape)
 
+    def test_forward_pass_unaligned_shape(self):
+        # The input is padded to a multiple of 16 and the output cropped back
+        model = UNet(channels_in=3, channels_out=2, hidden_size=16)
+        x = torch.randn(2, 3, 37, 50)
+        with mock.patch("gwen.models_cnn.dist.get_rank", return_value=0):
+            output = model(x)
+        self.assertEqual(output.shape, (2, 2, 37, 50))
+
     def test_train_with_configs(self):
         model = UNet(self.channels_in, self.channels_out, self.hidden_size)
         configs = {
@@ -88,7 +96,6 @@ class TestUNet(unittest.TestCase):
             "optimizer": torch.optim.Adam(model.parameters()),
             "scheduler": None,
             "loss_fn": torch.nn.MSELoss(),
-            "mask": None,
             "seed": 42,
         }
         configs_train = TrainingConfigCNN(**configs)
@@ -102,7 +109,6 @@ class TestUNet(unittest.TestCase):
             ],
             "device": "cpu",
             "loss_fn": torch.nn.MSELoss(),
-            "mask": None,
             "seed": 42,
         }
         configs_test = EvaluationConfigCNN(**configs)
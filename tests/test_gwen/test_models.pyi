@@ -22,5 +22,6 @@ class TestUNet(unittest.TestCase):
     x: Incomplete
     def setUp(self) -> None: ...
     def test_forward_pass(self) -> None: ...
+    def test_forward_pass_unaligned_shape(self) -> None: ...
     def test_train_with_configs(self) -> None: ...
     def test_eval_with_configs(self) -> None: ...
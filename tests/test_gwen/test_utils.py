@@ -2,15 +2,19 @@
 # Standard library
 import json
 import os
+from unittest import mock
 
 # Third-party
+import numpy as np
 import pytest
+import torch
 import xarray as xr
 
 # First-party
 from gwen.loggers_configs import setup_mlflow
 from gwen.models_cnn import UNet
 from gwen.models_gnn import GNNModel
+from gwen.utils import ConvDataset
 from gwen.utils import load_best_model
 from gwen.utils import load_config_and_data
 from gwen.utils import load_data
@@ -38,6 +42,35 @@ def experiment_name():
     return "GWEN"
 
 
+def test_conv_dataset_split():
+    data = xr.DataArray(
+        np.random.rand(3, 6, 4, 5),
+        dims=["time", "member", "height", "ncells"],
+    )
+    with mock.patch.dict("gwen.utils.config", {"simplify": False}):
+        dataset_train = ConvDataset(data, split=4, seed=23)
+        dataset_test = ConvDataset(data, split=4, seed=23)
+    # The same seed and number of members give the same split of the members
+    np.testing.assert_array_equal(
+        dataset_train.input_indices, dataset_test.input_indices
+    )
+    np.testing.assert_array_equal(
+        dataset_train.target_indices, dataset_test.target_indices
+    )
+    assert len(dataset_train) == 3
+    x, y = dataset_train[1]
+    assert isinstance(x, torch.Tensor)
+    assert isinstance(y, torch.Tensor)
+    assert x.shape == (4, 4, 5)
+    assert y.shape == (2, 4, 5)
+    torch.testing.assert_close(
+        x, torch.from_numpy(data.values[1, dataset_train.input_indices]).float()
+    )
+    torch.testing.assert_close(
+        y, torch.from_numpy(data.values[1, dataset_train.target_indices]).float()
+    )
+
+
 def test_load_best_model(exp_name):
     with pytest.raises(ValueError):
         load_best_model("nonexistent_experiment")
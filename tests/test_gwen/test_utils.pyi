@@ -1,6 +1,7 @@
 def config(): ...
 def data(config_json): ...
 def experiment_name(): ...
+def test_conv_dataset_split() -> None: ...
 def test_load_best_model(exp_name) -> None: ...
 def test_load_config_and_data(config_json) -> None: ...
 def test_load_data(config_json, data_load) -> None: ...